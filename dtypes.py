@@ -3,9 +3,17 @@ This module contains various common Dominion types and enums.
 
 """
 
-import re
+import operator
+import sys
 from enum import Enum
 
+_ENCODE_TABLE = str.maketrans({' ': '_', '/': '_', "'": '%27'})  # wiki file name encoding
+
+_CARD_JSON_KEYS = ('name', 'category', 'types', 'game_set', 'cost', 'text')  # Card.__init__ args stored in json
+_get_card_json_values = operator.attrgetter(*_CARD_JSON_KEYS)
+
+_COST_CACHE = {}  # (coins, potions, debt, has_exception) -> Cost
+
 
 class Card:
     """
@@ -13,6 +21,9 @@ class Card:
     
     """
 
+    __slots__ = ('name', 'category', 'types', 'type_mask', 'game_set', 'cost', 'text', 'encoded_name', '_in_supply',
+                 '_is_basic', '_can_pick')
+
     def __init__(self, name, category, types, game_set, cost, text, special_can_pick=False):
         """
         Creates a card instance.
@@ -34,16 +45,58 @@ class Card:
         """
 
         self.name = name
-        self.category = category
-        self.types = types
+        # category, types, and text repeat heavily across cards, so intern them to share one copy of each string
+        self.category = sys.intern(category)
+        self.types = tuple(sys.intern(t) for t in types)
         self.game_set = game_set
         self.cost = cost
-        self.text = text
-        self.in_supply = (self.category == 'Card' and 'This is not in the Supply' not in self.text and
-                          all(CardType.is_in_supply(t) for t in self.types))
-        self.is_basic = self.name.lower() in [c.name.lower() for c in BasicCard]
-        self.can_pick = special_can_pick or (self.in_supply and not self.is_basic)
-        self.encoded_name = self.name.replace(' ', '_').replace('/', '_').replace("'", '%27')
+        self.text = sys.intern(text)
+        self.type_mask = CardType.get_mask(self.types)
+        self.encoded_name = self.name.translate(_ENCODE_TABLE)
+        # computed on first access, as most consumers only read a subset of cards' flags
+        self._in_supply = None
+        self._is_basic = None
+        self._can_pick = True if special_can_pick else None  # special randomizers are always pickable
+
+    @property
+    def in_supply(self):
+        """
+        Checks if this card is in the supply, i.e. it is a Card without any non-supply types.
+        
+        :return: True if this card is in the supply, otherwise False.
+        :rtype: bool
+        """
+
+        if self._in_supply is None:
+            self._in_supply = (self.category == 'Card' and 'This is not in the Supply' not in self.text and
+                               self.type_mask & _NON_SUPPLY_MASK == 0)
+        return self._in_supply
+
+    @property
+    def is_basic(self):
+        """
+        Checks if this card is a basic card (Copper, Estate, etc.).
+        
+        :return: True if this card is a basic card, otherwise False.
+        :rtype: bool
+        """
+
+        if self._is_basic is None:
+            self._is_basic = self.name.lower() in _BASIC_NAMES
+        return self._is_basic
+
+    @property
+    def can_pick(self):
+        """
+        Checks if this card can be picked by the randomizer.
+        
+        :return: True if this card has a special randomizer or is a non-basic supply card, otherwise False.
+        :rtype: bool
+        """
+
+        if self._can_pick is None:
+            self._can_pick = self.in_supply and not self.is_basic
+        return self._can_pick
 
     @classmethod
     def from_json(cls, **json):
@@ -59,6 +112,21 @@ class Card:
         props['cost'] = Cost(**props['cost'])
         return cls(**props)
 
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Parses a Card from the given json dictionary, passing its values positionally rather than unpacking the dict.
+        
+        :param data: The card's json data, as written by __json__.
+        :type data: Dict[str, T]
+        :return: The card instance stored in the given json data.
+        :rtype: Card
+        """
+
+        cost = data['cost']
+        return cls(data['name'], data['category'], data['types'], GameSet.for_name(data['game_set']),
+                   Cost(cost['coins'], cost['potions'], cost['debt'], cost['has_exception']), data['text'])
+
     def __str__(self):
         """
         Formats this card like "Cellar (Card), Base, (Action), Cost(2C, 0P, 0D)"
@@ -67,29 +135,36 @@ class Card:
         :rtype: str
         """
 
-        return '%s (%s), %s, (%s), %s' % (self.name, self.category, self.game_set, ', '.join(self.types), self.cost)
+        return f'{self.name} ({self.category}), {self.game_set}, ({", ".join(self.types)}), {self.cost}'
 
     def __json__(self):
         """
         Creates a dict of this card's data to be stored in a json file.
         
-        :return: This card's data as a dict.
+        :return: This card's data as a dict, containing only plain json types.
         :rtype: Dict[str, T]
         """
 
-        return {'name': self.name, 'category': self.category, 'types': self.types, 'game_set': self.game_set,
-                'cost': self.cost, 'text': self.text}
+        data = dict(zip(_CARD_JSON_KEYS, _get_card_json_values(self)))
+        # encoded here so the dict needs no further encoder callbacks (orjson would encode GameSet by enum value)
+        # game sets missing from GameSet (i.e. newer expansions) parse as None and are written as null
+        data['game_set'] = self.game_set.__json__() if self.game_set is not None else None
+        data['cost'] = self.cost.__json__()
+        return data
 
 
 class Cost:
     """
     Represents a cost, consisting of coins, potions, and/or debt.
+    Costs are shared between cards, so each distinct cost has exactly one instance.
     
     """
 
-    def __init__(self, coins=0, potions=0, debt=0, has_exception=False):
+    __slots__ = ('coins', 'potions', 'debt', 'has_exception')
+
+    def __new__(cls, coins=0, potions=0, debt=0, has_exception=False):
         """
-        Creates a Cost instance.
+        Gets the Cost instance for the given components, creating it if this cost has not been seen before.
         
         :param coins: The cost's coins component, defaults to 0
         :param coins: int, optional
@@ -99,12 +174,50 @@ class Cost:
         :param debt: int, optional
         :param has_exception: True if the card's cost has an asterisk, defaults to False
         :param has_exception: bool, optional
+        :return: The shared Cost instance.
+        :rtype: Cost
+        """
+
+        key = (int(coins), int(potions), int(debt), bool(has_exception))
+        cost = _COST_CACHE.get(key)
+        if cost is None:
+            cost = super().__new__(cls)
+            cost.coins, cost.potions, cost.debt, cost.has_exception = key
+            _COST_CACHE[key] = cost
+        return cost
+
+    def __reduce__(self):
+        """
+        Pickles this cost by its components, so unpickling goes through __new__ and returns the shared instance.
+        Without this, pickle would fetch the zero expense Cost from __new__ and overwrite its components.
+        
+        :return: The Cost class and this cost's constructor arguments.
+        :rtype: Tuple[type, Tuple[int, int, int, bool]]
+        """
+
+        return (Cost, (self.coins, self.potions, self.debt, self.has_exception))
+
+    def __copy__(self):
+        """
+        Returns this cost, as costs are shared and never modified.
+        
+        :return: This cost.
+        :rtype: Cost
+        """
+
+        return self
+
+    def __deepcopy__(self, memo):
+        """
+        Returns this cost, as costs are shared and never modified.
+        
+        :param memo: The deepcopy memo dictionary, unused.
+        :type memo: Dict[int, T]
+        :return: This cost.
+        :rtype: Cost
         """
 
-        self.coins = int(coins)
-        self.potions = int(potions)
-        self.debt = int(debt)
-        self.has_exception = bool(has_exception)
+        return self
 
     @classmethod
     def from_raw(cls, raw_cost):
@@ -122,15 +235,27 @@ class Cost:
         :rtype: Cost
         """
 
-        m = re.match(r'\{\{Cost\|(\d+)(\*?)(P?)\}\}', raw_cost)  # e.g. {{Cost|5}} or {{Cost|5P}}
-        if m:
-            return cls(coins=m.group(1), potions=1 if m.group(3) else 0, has_exception=m.group(2))
-        m = re.match(r'\{\{Cost\|(\d+)\|\|(\d+)\}\}', raw_cost)  # e.g. {{Cost|4||3}}
-        if m:
-            return cls(coins=m.group(1), debt=m.group(2))
-        m = re.match(r'\{\{Cost\| \| \|(\d+)\}\}', raw_cost)  # e.g. {{Cost| | |8}}
-        if m:
-            return cls(debt=m.group(1))
+        # the cost grammar is fixed, so plain string operations outperform a regex here
+        end = raw_cost.find('}}', 7)
+        if not raw_cost.startswith('{{Cost|') or end == -1:
+            return cls()  # zero expense Cost
+        fields = raw_cost[7:end].split('|')
+        if len(fields) == 1:  # e.g. {{Cost|5}}, {{Cost|5*}}, or {{Cost|5P}}
+            coins = fields[0]
+            has_potion = coins.endswith('P')
+            if has_potion:
+                coins = coins[:-1]
+            has_exception = coins.endswith('*')
+            if has_exception:
+                coins = coins[:-1]
+            if coins.isdecimal():
+                return cls(coins=coins, potions=1 if has_potion else 0, has_exception=has_exception)
+        elif len(fields) == 3:
+            coins, empty, debt = fields
+            if empty == '' and coins.isdecimal() and debt.isdecimal():  # e.g. {{Cost|4||3}}
+                return cls(coins=coins, debt=debt)
+            if coins == ' ' and empty == ' ' and debt.isdecimal():  # e.g. {{Cost| | |8}}
+                return cls(debt=debt)
         return cls()  # zero expense Cost
 
     def __str__(self):
@@ -141,16 +266,16 @@ class Cost:
         :rtype: str
         """
 
-        if all(x is 0 for x in [self.coins, self.potions, self.debt]):
+        if self.coins == 0 and self.potions == 0 and self.debt == 0:
             return 'Cost(0)'
         parts = []
         if self.coins > 0 or self.has_exception:
-            parts.append(str(self.coins) + 'C' + ('*' if self.has_exception else ''))
+            parts.append(f'{self.coins}C*' if self.has_exception else f'{self.coins}C')
         if self.potions > 0:
-            parts.append(str(self.potions) + 'P')
+            parts.append(f'{self.potions}P')
         if self.debt > 0:
-            parts.append(str(self.debt) + 'D')
-        return 'Cost(%s)' % ', '.join(parts)
+            parts.append(f'{self.debt}D')
+        return f'Cost({", ".join(parts)})'
 
     def __json__(self):
         """
@@ -160,7 +285,7 @@ class Cost:
         :rtype: Dict[str, T]
         """
 
-        return self.__dict__
+        return {'coins': self.coins, 'potions': self.potions, 'debt': self.debt, 'has_exception': self.has_exception}
 
 
 class GameSet(Enum):
@@ -214,8 +339,17 @@ class GameSet(Enum):
         :rtype: bool
         """
 
-        # uses startswith to handle editioned sets properly
-        return self.full_set_name.startswith(card.game_set.full_set_name)
+        return card.game_set in _GAME_SET_CONTENTS[self]
+
+    def contained_sets(self):
+        """
+        Gets the game sets whose cards this game set contains, i.e. itself and, if editioned, its non-editioned set.
+        
+        :return: The game sets contained by this set.
+        :rtype: FrozenSet[GameSet]
+        """
+
+        return _GAME_SET_CONTENTS[self]
 
     def as_arg(self):
         """
@@ -258,11 +392,7 @@ class GameSet(Enum):
         :rtype: GameSet
         """
 
-        arg = arg.lower().replace(' ', '')
-        for game_set in cls:
-            if game_set.as_arg() == arg:
-                return game_set
-        return None
+        return _GAME_SETS_BY_ARG.get(arg.lower().replace(' ', ''))
 
     @classmethod
     def for_name(cls, name):
@@ -275,21 +405,25 @@ class GameSet(Enum):
         :rtype: GameSet
         """
 
-        for game_set in cls:
-            if game_set.full_set_name == name:
-                return game_set
-        return None
+        return _GAME_SETS_BY_NAME.get(name)
 
     @classmethod
     def complete_sets(cls):
         """
         Gets all complete sets.
         
-        :return: A list of all complete game sets.
-        :rtype: List[GameSet]
+        :return: A tuple of all complete game sets.
+        :rtype: Tuple[GameSet]
         """
 
-        return [g for g in GameSet if g.complete]
+        return _COMPLETE_GAME_SETS
+
+
+_GAME_SETS_BY_NAME = {g.full_set_name: g for g in GameSet}
+_GAME_SETS_BY_ARG = {g.as_arg(): g for g in GameSet}
+_COMPLETE_GAME_SETS = tuple(g for g in GameSet if g.complete)
+# uses startswith to handle editioned sets properly, i.e. Base 2E contains both Base 2E and Base cards
+_GAME_SET_CONTENTS = {g: frozenset(o for o in GameSet if g.full_set_name.startswith(o.full_set_name)) for g in GameSet}
 
 
 class CardCategory(Enum):
@@ -326,6 +460,9 @@ class BasicCard(Enum):
     POTION = 9
 
 
+_BASIC_NAMES = frozenset(c.name.lower() for c in BasicCard)
+
+
 class CardType(Enum):
     """
     An enumeration of card types (Attack, Duration, etc.) and whether or not cards with each type are in the supply.
@@ -359,7 +496,7 @@ class CardType(Enum):
         """
         Creates a card type.
         
-        :param value: The enum index, used only for creating unique objects.
+        :param value: The enum index, used for creating unique objects and as this type's bit in type masks.
         :type value: int
         :param in_supply: True if cards of this type are in the supply, otherwise False.
                           If a card has any type where in_supply is False, then that card is not in the supply.
@@ -367,6 +504,7 @@ class CardType(Enum):
         """
 
         self.in_supply = in_supply
+        self.mask = 1 << value
 
     def get_name(self):
         return str(self.name)[0] + str(self.name)[1:].lower()
@@ -382,10 +520,29 @@ class CardType(Enum):
         :rtype: bool
         """
 
-        for t in CardType:
-            if t.name.lower() == card_type.lower():
-                return t.in_supply
-        return False
+        return _TYPE_IN_SUPPLY.get(card_type.lower(), False)
+
+    @classmethod
+    def get_mask(cls, card_types):
+        """
+        Packs the given card types into a bitmask of CardType masks, where unrecognized types set the unknown type bit.
+        
+        :param card_types: The card types to pack.
+        :type card_types: Iterable[str]
+        :return: The bitwise OR of the card types' masks.
+        :rtype: int
+        """
+
+        mask = 0
+        for card_type in card_types:
+            mask |= _TYPE_MASKS.get(card_type.lower(), _UNKNOWN_TYPE_MASK)
+        return mask
+
+
+_TYPE_IN_SUPPLY = {t.name.lower(): t.in_supply for t in CardType}
+_TYPE_MASKS = {t.name.lower(): t.mask for t in CardType}
+_UNKNOWN_TYPE_MASK = 1 << len(CardType)  # types missing from CardType, treated as not in the supply
+_NON_SUPPLY_MASK = CardType.get_mask(t.name for t in CardType if not t.in_supply) | _UNKNOWN_TYPE_MASK
 
 
 class SpecialTypeCard(Enum):
@@ -5,20 +5,26 @@ This module contains CardFetcher, which can be called via command line to fetch
 """
 
 import argparse
-import json
 import os
 import re
-import shutil
-import urllib.request
+import urllib.parse
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from json_util import JSONUnderscoreEncoder
+from json_util import dump_json
 from dtypes import Card, Cost, GameSet, SpecialTypeCard, SplitPileCard
 
+_ROW_SEPARATOR = '\n|-\n'
+_FIELD_SEPARATOR_PATTERN = re.compile(r'\D\|\|\D')
+_FIELD_COUNT = 5  # name, set, types, cost, text
+_NAME_PATTERN = re.compile(r'\|\{\{(.*?)\|(.*?)\}\}')  # e.g. |{{Card|Cellar}}
+_GAME_SET_PATTERN = re.compile(r'\[\[(.*?)\]\](, <abbr.+>([12]E)<)?')  # e.g. [[Base]], <abbr ...>1E</abbr>
+
 
 class CardFetcher:
     """
@@ -26,6 +32,20 @@ class CardFetcher:
     
     """
 
+    def __init__(self):
+        """
+        Creates a card fetcher with a pooled HTTP session, reusing connections to the Dominion Wiki across requests.
+        
+        """
+
+        self.cards = []
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.3))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)  # image urls resolved by the wiki api may use https
+        # relies on requests' default Accept-Encoding of gzip, deflate to fetch the plain text card list compressed
+        self.session.headers['User-Agent'] = 'DominionRandomizer/1.0'
+
     def fetch_cards(self):
         """
         Fetches and parses all cards from the Dominion Wiki.
@@ -33,33 +53,84 @@ class CardFetcher:
         
         """
 
-        cards = []
-        response = requests.get('http://wiki.dominionstrategy.com/index.php/List_of_cards?action=raw')
-        raw_cards = response.content.decode('utf-8').split('\n|-\n')
-        for raw_card in raw_cards[1:]:  # skip data header line
-            card = self.parse_card_data(raw_card)
-            cards.append(card)
-        self.cards = cards
+        response = self.session.get('http://wiki.dominionstrategy.com/index.php/List_of_cards?action=raw')
+        self.cards = self.parse_card_list(response.content.decode('utf-8'))
         self.add_special_cards()
 
-    def fetch_card_image(self, card):
+    def parse_card_list(self, raw_data):
+        """
+        Parses all Card objects from the given raw card list pulled from the Dominion Wiki.
+        
+        :param raw_data: The raw card list, a table with rows separated by "|-" lines.
+        :type raw_data: str
+        :raises ValueError: If a card row has fewer fields than expected.
+        :return: The Cards parsed from the card list's rows.
+        :rtype: List[Card]
+        """
+
+        # rows are split first so that field separators can never consume a row separator
+        return [self.parse_card_data(raw_card) for raw_card in raw_data.split(_ROW_SEPARATOR)[1:]]  # skip header
+
+    def get_cards_missing_images(self, cards):
         """
-        Fetches a given card's image at maximum available resolution and saves it to res/cards/{name}.jpg.
+        Gets the given cards whose images have not yet been saved to res/cards/, listing that directory only once.
+        
+        :param cards: The cards to check.
+        :type cards: List[Card]
+        :return: The cards without a saved image.
+        :rtype: List[Card]
+        """
+
+        images_path = Path('res') / 'cards'
+        existing = {entry.name for entry in os.scandir(images_path)} if images_path.exists() else set()
+        return [c for c in cards if c.encoded_name + '.jpg' not in existing]
+
+    def get_image_urls(self, cards):
+        """
+        Resolves the given cards' full resolution image urls via the Dominion Wiki API, 50 file titles per request.
+        Uses http://wiki.dominionstrategy.com/api.php?action=query&prop=imageinfo&iiprop=url.
+        
+        :param cards: The cards to get the image urls of.
+        :type cards: List[Card]
+        :return: The image urls by card encoded name, omitting cards whose image does not exist.
+        :rtype: Dict[str, str]
+        """
+
+        image_urls = {}
+        for i in range(0, len(cards), 50):  # the API accepts at most 50 titles per query
+            titles = {'File:%s.jpg' % urllib.parse.unquote(c.encoded_name): c.encoded_name for c in cards[i:i + 50]}
+            response = self.session.get('http://wiki.dominionstrategy.com/api.php',
+                                        params={'action': 'query', 'format': 'json', 'prop': 'imageinfo',
+                                                'iiprop': 'url', 'titles': '|'.join(titles)})
+            query = response.json()['query']
+            for normalized in query.get('normalized', []):  # titles come back normalized, e.g. _ to spaces
+                titles[normalized['to']] = titles.pop(normalized['from'])
+            for page in query['pages'].values():
+                if 'imageinfo' in page:
+                    image_urls[titles[page['title']]] = page['imageinfo'][0]['url']
+        return image_urls
+
+    def fetch_card_image(self, card, image_url):
+        """
+        Fetches a given card's image from the given url and saves it to res/cards/{name}.jpg.
         If the image already exists at that path, this function returns without doing anything.
+        The res/cards/ directory must already exist.
         
         :param card: The card to fetch the image of.
         :type card: Card
+        :param image_url: The card's image url, as resolved by get_image_urls.
+        :type image_url: str
         """
 
         filepath = Path('res') / 'cards' / (card.encoded_name + '.jpg')
         if not filepath.exists():
-            response = requests.get('http://wiki.dominionstrategy.com/index.php/File:%s.jpg' % card.encoded_name)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            image_url = 'http://wiki.dominionstrategy.com/' + soup.select_one('#file a').get('href')
-            temp_path, headers = urllib.request.urlretrieve(image_url)
-            if not filepath.parent.exists():
-                filepath.parent.mkdir()
-            shutil.move(temp_path, filepath)
+            temp_path = filepath.with_suffix('.jpg.part')  # same directory, so the final rename is atomic
+            with self.session.get(image_url, stream=True) as response:
+                response.raise_for_status()  # otherwise an error page would be saved and never fetched again
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(65536):
+                        f.write(chunk)
+            os.replace(temp_path, filepath)
 
     def parse_card_data(self, raw_card):
         """
@@ -68,16 +139,39 @@ class CardFetcher:
         
         :param raw_card: The raw card data entry.
         :type raw_card: str
+        :raises ValueError: If the entry has fewer fields than expected.
         :return: The Card parsed from the data.
         :rtype: Card
         """
 
-        raw = re.split(r'\D\|\|\D', raw_card)
-        name, category = self.get_name_and_category(raw[0])
-        game_set = self.get_game_set(raw[1])
-        types = self.get_types(raw[2])
-        cost = self.get_cost(raw[3])
-        text = raw[4].strip()
+        raw = _FIELD_SEPARATOR_PATTERN.split(raw_card)
+        if len(raw) < _FIELD_COUNT:
+            raise ValueError('expected %d fields in card entry, found %d: %r' % (_FIELD_COUNT, len(raw), raw_card))
+        return self.create_card(*raw[:_FIELD_COUNT])
+
+    def create_card(self, raw_name, raw_game_set, raw_types, raw_cost, raw_text):
+        """
+        Creates a Card object from the given raw fields of a card data entry pulled from the Dominion Wiki.
+        
+        :param raw_name: The raw name and category field, like "|{{Card|Cellar}}".
+        :type raw_name: str
+        :param raw_game_set: The raw game set field, like "[[Base]]".
+        :type raw_game_set: str
+        :param raw_types: The raw types field, like "Action - Reaction".
+        :type raw_types: str
+        :param raw_cost: The raw cost field, like "{{Cost|2}}".
+        :type raw_cost: str
+        :param raw_text: The raw card text field.
+        :type raw_text: str
+        :return: The Card parsed from the fields.
+        :rtype: Card
+        """
+
+        name, category = self.get_name_and_category(raw_name)
+        game_set = self.get_game_set(raw_game_set)
+        types = self.get_types(raw_types)
+        cost = self.get_cost(raw_cost)
+        text = raw_text.strip()
         return Card(name, category, types, game_set, cost, text)
 
     def get_name_and_category(self, raw):
@@ -90,7 +184,12 @@ class CardFetcher:
         :rtype: Tuple[str]
         """
 
-        m = re.match(r'\|\{\{(.*?)\|(.*?)\}\}', raw)
+        end = raw.find('}}', 3)
+        if raw.startswith('|{{') and end != -1:
+            category, separator, name = raw[3:end].partition('|')
+            if separator:
+                return name, category
+        m = _NAME_PATTERN.match(raw)  # fall back to the regex for entries not in the usual shape
         name = m.group(2)
         category = m.group(1)
         return name, category
@@ -105,9 +204,19 @@ class CardFetcher:
         :rtype: GameSet
         """
 
-        m = re.match(r'\[\[(.*?)\]\](, <abbr.+>([12]E)<)?', raw)
-        game_set = m.group(1)
-        edition = m.group(3)
+        end = raw.find(']]', 2)
+        if raw.startswith('[[') and end != -1:
+            game_set = raw[2:end]
+            edition = None
+            rest = raw[end + 2:]
+            if rest.startswith(', <abbr'):
+                i = max(rest.rfind('>1E<'), rest.rfind('>2E<'))  # the last edition tag, as in _GAME_SET_PATTERN
+                if i > len(', <abbr'):
+                    edition = rest[i + 1:i + 3]
+        else:
+            m = _GAME_SET_PATTERN.match(raw)
+            game_set = m.group(1)
+            edition = m.group(3)
         name = game_set + (' ' + edition if edition else '')
         return GameSet.for_name(name)
 
@@ -150,22 +259,30 @@ class CardFetcher:
 def main():
     """
     Runs the card fetcher and saves cards to res/cards.json.
-    If the -i/--images argument is specified, the fetcher will also retrieve card images, saved to res/cards/*.jpg.
+    If the -i/--images argument is specified, the fetcher will also retrieve card images, saved to res/cards/*.jpg,
+    using -w/--workers concurrent downloads. Fetched cards are printed if the -v/--verbose argument is specified.
     
     """
 
     parser = argparse.ArgumentParser()
     parser.add_argument('-i', '--images', action='store_true', help='Fetch card images')
+    parser.add_argument('-w', '--workers', type=int, default=16,
+                        help='Number of card images to fetch concurrently, default 16')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print each fetched card')
     args = parser.parse_args()
     fetcher = CardFetcher()
     fetcher.fetch_cards()
-    for card in fetcher.cards:
-        if args.images:
-            fetcher.fetch_card_image(card)
-        print(card)
+    if args.images:
+        (Path('res') / 'cards').mkdir(parents=True, exist_ok=True)  # created once, before workers race to it
+        missing = fetcher.get_cards_missing_images(fetcher.cards)
+        image_urls = fetcher.get_image_urls(missing)
+        cards = [c for c in missing if c.encoded_name in image_urls]
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(fetcher.fetch_card_image, cards, [image_urls[c.encoded_name] for c in cards]))
+    if args.verbose:
+        print('\n'.join(str(card) for card in fetcher.cards))  # one write instead of one per card
     json_path = os.path.join(os.path.dirname(__file__), 'res/cards.json')
-    with open(json_path, 'w') as f:
-        json.dump(fetcher.cards, f, cls=JSONUnderscoreEncoder)
+    dump_json([card.__json__() for card in fetcher.cards], json_path)
         
 if __name__ == '__main__':
     main()
@@ -1,10 +1,15 @@
 """
-This module contains a custom JSON encoder that looks for __json__ functions.
+This module contains a custom JSON encoder that looks for __json__ functions, and JSON file loading and dumping.
 
 """
 
 import json
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library json module is used without it
+    orjson = None
+
 
 class JSONUnderscoreEncoder(json.JSONEncoder):
     """
@@ -14,12 +19,49 @@ class JSONUnderscoreEncoder(json.JSONEncoder):
 
     def default(self, obj):  # pylint: disable=E0202
         """
-        Overrides the standard JSONEncoder's default encoder to check for the callable __json__ attribute.
+        Overrides the standard JSONEncoder's default encoder to check for a __json__ function on the object's class.
         
         :return: The JSON encoded object.
         :rtype: str
         """
 
-        if hasattr(obj, '__json__') and callable(getattr(obj, '__json__')):
-            return obj.__json__()
-        return json.JSONEncoder.default(self, obj)
\ No newline at end of file
+        to_json = getattr(type(obj), '__json__', None)  # looked up on the class to skip binding a method
+        if to_json is not None:
+            return to_json(obj)
+        return json.JSONEncoder.default(self, obj)
+
+
+def load_json(path):
+    """
+    Loads the JSON file at the given path, parsing with orjson if it is installed.
+    
+    :param path: The JSON file path.
+    :type path: str
+    :return: The parsed JSON data.
+    :rtype: T
+    """
+
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def dump_json(data, path):
+    """
+    Dumps the given data to a compact UTF-8 JSON file at the given path in a single write, serializing with orjson if
+    it is installed. Objects are encoded with their __json__ functions.
+    
+    :param data: The data to dump.
+    :type data: T
+    :param path: The JSON file path.
+    :type path: str
+    """
+
+    if orjson is not None:
+        payload = orjson.dumps(data, default=lambda obj: type(obj).__json__(obj))
+    else:
+        payload = json.dumps(data, cls=JSONUnderscoreEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    with open(path, 'wb') as f:
+        f.write(payload)
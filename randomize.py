@@ -9,6 +9,10 @@ import os
 from dtypes import CardType, GameSet
 from randomizer import Randomizer
 
+_GAME_CHOICES = [g.as_arg() for g in GameSet.complete_sets()] + ['all']
+_TYPE_CHOICES = [t.name.lower() for t in CardType
+                 if t.in_supply and t is not CardType.CURSE]  # curse type only present on basic curse card
+
 
 class RandomizerParser():
     """
@@ -40,6 +44,8 @@ class RandomizerParser():
                                 Number of events to pick
         -l LANDMARKS, --landmarks LANDMARKS
                                 Number of landmarks to pick
+        -s SEED, --seed SEED  Seed for the random number generator, for
+                                repeatable results
     """
 
     def get_randomizer(self, data_path):
@@ -54,7 +60,7 @@ class RandomizerParser():
 
         return Randomizer(data_path, self.args.sets, self.args.number, self.args.weights, self.args.counts,
                           self.args.include, self.args.exclude, self.args.filter_types, self.args.events,
-                          self.args.landmarks)
+                          self.args.landmarks, self.args.seed)
 
     def parse_args(self):
         """
@@ -62,9 +68,7 @@ class RandomizerParser():
         """
 
         self.parser = argparse.ArgumentParser()
-        game_choices = [g.as_arg() for g in GameSet.complete_sets()]
-        game_choices.append('all')
-        self.parser.add_argument('sets', nargs='+', choices=game_choices, help='Game sets to choose from, or all')
+        self.parser.add_argument('sets', nargs='+', choices=_GAME_CHOICES, help='Game sets to choose from, or all')
         self.parser.add_argument('-n', '--number', type=int, default=10, help='Number of cards to pick, default 10')
         distribution_group = self.parser.add_mutually_exclusive_group()
         distribution_group.add_argument('-w', '--weights', nargs='+', type=float, default=[],
@@ -73,12 +77,12 @@ class RandomizerParser():
                                         help='Counts of cards to pick from each set')
         self.parser.add_argument('-i', '--include', nargs='+', default=[], help='Specific cards to include')
         self.parser.add_argument('-x', '--exclude', nargs='+', default=[], help='Specific cards to exclude')
-        type_choices = [t.name.lower() for t in CardType if t.in_supply]
-        type_choices.remove('curse')  # curse type only present on basic curse card
-        self.parser.add_argument('-f', '--filter-types', nargs='+', choices=type_choices, default=[],
+        self.parser.add_argument('-f', '--filter-types', nargs='+', choices=_TYPE_CHOICES, default=[],
                                  help='Specific cards types to filter out before randomly picking cards')
         self.parser.add_argument('-e', '--events', type=int, default=0, help='Number of events to pick')
         self.parser.add_argument('-l', '--landmarks', type=int, default=0, help='Number of landmarks to pick')
+        self.parser.add_argument('-s', '--seed', type=int, default=None,
+                                 help='Seed for the random number generator, for repeatable results')
         self.args = self.parser.parse_args()
 
 
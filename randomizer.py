@@ -3,10 +3,33 @@ This module contains Randomizer, used to generate random Dominion kingdoms with
 
 """
 
-import json
+import os
 import random
-from collections import defaultdict
-from dtypes import Card, GameSet, SpecialTypeCard, SplitPileCard
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import accumulate, chain, groupby
+from operator import attrgetter
+from dtypes import Card, CardType, GameSet, SpecialTypeCard, SplitPileCard
+from json_util import load_json
+
+_STANDARDIZE_TABLE = str.maketrans('', '', "' ")  # deletes apostrophes and spaces
+
+
+@lru_cache(maxsize=8)
+def _load_all_cards(data_path, mtime):
+    """
+    Loads cards from the given data path, cached across randomizers until the file's modification time changes.
+    Cards are shared between randomizers and must not be modified.
+    
+    :param data_path: The cards.json file path.
+    :type data_path: str
+    :param mtime: The file's modification time, used only as part of the cache key.
+    :type mtime: float
+    :return: The loaded cards.
+    :rtype: Tuple[Card]
+    """
+
+    return tuple(map(Card.from_dict, load_json(data_path)))
 
 
 class Randomizer():
@@ -17,7 +40,7 @@ class Randomizer():
     """
 
     def __init__(self, data_path, sets, number=10, weights=[], counts=[], include=[], exclude=[], filter_types=[],
-                 n_events=0, n_landmarks=0):
+                 n_events=0, n_landmarks=0, seed=None):
         """
         Creates a randomizer with given arguments.
         
@@ -41,22 +64,34 @@ class Randomizer():
         :type n_events: int, optional
         :param n_landmarks: The number of landmarks to pick, defaults to 0.
         :type n_landmarks: int, optional
+        :param seed: The seed for this randomizer's random number generator, defaults to None (seeded by the system).
+        :type seed: int, optional
         """
 
         self.data_path = data_path
         self.sets = GameSet.complete_sets() if 'all' in sets else [GameSet.for_arg(set_arg) for set_arg in sets]
+        self.set_lookup = frozenset(self.sets)  # for constant time membership tests
+        # maps each game set contained by the chosen sets, i.e. Base for Base 2E, to the chosen set containing it;
+        # validate_configuration rejects overlapping chosen sets, so each game set has exactly one containing set
+        self.containing_sets = {card_set: game_set for game_set in self.sets for card_set in game_set.contained_sets()}
         self.number = int(number)
         self.weights = weights
         self.counts = counts
         self.include = include
         self.exclude = exclude
         self.filter_types = [t.lower() for t in filter_types]
+        self.filter_mask = CardType.get_mask(self.filter_types)
         self.n_events = int(n_events)
         self.n_landmarks = int(n_landmarks)
         self.count = self.number - len(self.include)
         self.mode = 'weighted' if self.weights else 'counted' if self.counts else 'normal'
+        self.cum_weights = list(accumulate(self.weights))  # computed once for all weighted randomize calls
+        self.rng = random.Random(seed)
         self.cards = {}
         self.possible_cards = {}
+        self.cards_by_name = {}
+        self.pool_set_by_card = {}
+        self.card_pool = None  # flattened normal mode pool, built on first use and after pool edits
         self.included_cards = []
         self.events = []
         self.landmarks = []
@@ -73,16 +108,17 @@ class Randomizer():
         
         """
 
-        cards = defaultdict(list)
-        for game_set, set_cards in self.cards.items():
-            cards[game_set.set_name].extend(set_cards)
-        for game_set in sorted(cards.keys()):
-            print(game_set)
-            cards[game_set].sort(key=lambda c: c.name)
-            for card in cards[game_set]:
-                print('- %s (%s), %s' % (card.name, ', '.join(card.types), card.cost))
-        self.print_non_cards(self.events, 'Events', True)
-        self.print_non_cards(self.landmarks, 'Landmarks', False)
+        lines = []
+        # editioned sets share a set name, so their cards are listed together
+        game_sets = sorted(self.cards, key=attrgetter('set_name'))
+        for set_name, grouped_sets in groupby(game_sets, key=attrgetter('set_name')):
+            lines.append(set_name)
+            for card in sorted(chain.from_iterable(self.cards[g] for g in grouped_sets), key=attrgetter('name')):
+                lines.append(f'- {card.name} ({", ".join(card.types)}), {card.cost}')
+        lines.extend(self.format_non_cards(self.events, 'Events', True))
+        lines.extend(self.format_non_cards(self.landmarks, 'Landmarks', False))
+        if lines:
+            print('\n'.join(lines))  # one write rather than one per line
 
     def print_non_cards(self, card_list, label, print_cost):
         """
@@ -96,13 +132,29 @@ class Randomizer():
         :type print_cost: bool
         """
 
-        if len(card_list) > 0:
-            print(label)
-            for card in card_list:
-                if print_cost:
-                    print('- %s, %s, %s' % (card.name, card.game_set, card.cost))
-                else:
-                    print('- %s, %s' % (card.name, card.game_set))
+        lines = self.format_non_cards(card_list, label, print_cost)
+        if lines:
+            print('\n'.join(lines))
+
+    def format_non_cards(self, card_list, label, print_cost):
+        """
+        Formats the given list of non-card cards (i.e. Events, Landmarks) as lines under the given label.
+        
+        :param card_list: The cards to format.
+        :type card_list: List[Card]
+        :param label: The header to list the cards under.
+        :type label: str
+        :param print_cost: True to include the card cost, otherwise False
+        :type print_cost: bool
+        :return: The label and card lines, or an empty list if there are no cards.
+        :rtype: List[str]
+        """
+
+        if len(card_list) == 0:
+            return []
+        if print_cost:
+            return [label] + [f'- {card.name}, {card.game_set}, {card.cost}' for card in card_list]
+        return [label] + [f'- {card.name}, {card.game_set}' for card in card_list]
 
     def randomize(self):
         """
@@ -110,25 +162,43 @@ class Randomizer():
         
         """
 
-
-        if self.mode == 'counted':
-            counts = {self.sets[i]: self.counts[i] for i in range(len(self.sets))}
+        if self.mode == 'normal':
+            # drawing from all pools at once, like shuffling every set's randomizer cards together
+            if self.card_pool is None:
+                # shared by normal mode randomizations until the pools change; possible_cards holds one pool per
+                # distinct set, so a set given more than once does not add its cards twice
+                self.card_pool = list(chain.from_iterable(self.possible_cards.values()))
+            self.cards = defaultdict(list)
+            for card in self.rng.sample(self.card_pool, self.count):
+                self.cards[self.pool_set_by_card[card]].append(card)
         else:
-            if self.mode == 'normal':
-                # weight set picks based on how many cards in each set
-                weights = [len(set_cards) for game_set, set_cards in self.possible_cards.items()]
-                set_picks = random.choices(self.sets, weights=weights, k=self.count)
-            elif self.mode == 'weighted':
-                set_picks = random.choices(self.sets, weights=self.weights, k=self.count)
-            counts = defaultdict(int)
-            for set_pick in set_picks:
-                counts[set_pick] += 1
-        cards = {game_set: self.randomize_set(game_set, count) for game_set, count in counts.items()}
-        self.cards = defaultdict(list, cards)
+            if self.mode == 'counted':
+                counts = {self.sets[i]: self.counts[i] for i in range(len(self.sets))}
+            else:
+                counts = Counter(self.rng.choices(self.sets, cum_weights=self.cum_weights, k=self.count))
+            cards = {game_set: self.randomize_set(game_set, count) for game_set, count in counts.items()}
+            self.cards = defaultdict(list, cards)
         for card in self.included_cards:
             self.cards[card.game_set].append(card)
-        self.events = random.sample(self.possible_events, self.n_events)
-        self.landmarks = random.sample(self.possible_landmarks, self.n_landmarks)
+        self.events = self.rng.sample(self.possible_events, self.n_events)
+        self.landmarks = self.rng.sample(self.possible_landmarks, self.n_landmarks)
+
+    def randomize_many(self, n):
+        """
+        Picks the given number of independent random kingdoms, reusing the loaded card pools for each one.
+        The randomizer's cards, events, and landmarks are left as the last kingdom picked.
+        
+        :param n: The number of kingdoms to pick.
+        :type n: int
+        :return: Each kingdom's cards by game set, events, and landmarks.
+        :rtype: List[Tuple[Dict[GameSet, List[Card]], List[Card], List[Card]]]
+        """
+
+        kingdoms = []
+        for _ in range(n):
+            self.randomize()  # builds new containers on every call, so earlier kingdoms are left untouched
+            kingdoms.append((self.cards, self.events, self.landmarks))
+        return kingdoms
 
     def randomize_set(self, game_set, count):
         """
@@ -142,7 +212,7 @@ class Randomizer():
         :rtype: List[Card]
         """ 
 
-        return random.sample(self.possible_cards[game_set], k=count)
+        return self.rng.sample(self.possible_cards[game_set], k=count)
 
     def load_cards(self):
         """
@@ -150,24 +220,37 @@ class Randomizer():
         
         """
 
-        with open(self.data_path) as f:
-            data = json.load(f)
-            self.all_cards = [Card.from_json(**d) for d in data]
-        for game_set in self.sets:
-            # less efficient than building by card.game_set but done to handle editioned sets
-            self.possible_cards[game_set] = [c for c in self.all_cards
-                                             if game_set.contains(c) and self.is_possible_card(c)]
+        self.all_cards = list(_load_all_cards(self.data_path, os.path.getmtime(self.data_path)))
+        self.possible_cards = {game_set: [] for game_set in self.sets}
+        # routes each card to the pool of the chosen set containing its game set, which handles editioned sets
+        pools = {card_set: self.possible_cards[game_set] for card_set, game_set in self.containing_sets.items()}
+        # non-cards are only collected for categories requested, as most runs draw no events or landmarks
+        non_cards = {category: [] for category, count in (('Event', self.n_events), ('Landmark', self.n_landmarks))
+                     if count > 0}
+        # one pass indexes names and sorts each chosen card into its pool or its non-card category
+        for card in self.all_cards:
+            self.cards_by_name.setdefault(Randomizer.standardize_input(card.name), []).append(card)
+            if card.category in non_cards:
+                if self.any_set_contains(card):
+                    non_cards[card.category].append(card)
+            else:
+                pool = pools.get(card.game_set)
+                if pool is not None and self.is_possible_card(card):
+                    pool.append(card)
         self.add_special_type_cards()
         self.remove_split_pile_cards()
-        self.possible_events = self.get_non_cards('Event', self.n_events)
-        self.possible_landmarks = self.get_non_cards('Landmark', self.n_landmarks)
-        self.add_inclusions()
-        self.add_exclusions()
+        self.index_special_card_names()
+        self.pool_set_by_card = {c: game_set for game_set, set_cards in self.possible_cards.items() for c in set_cards}
+        self.possible_events = self.get_non_cards(non_cards.get('Event', []), 'Event', self.n_events)
+        self.possible_landmarks = self.get_non_cards(non_cards.get('Landmark', []), 'Landmark', self.n_landmarks)
+        self.add_inclusions_and_exclusions()
 
-    def get_non_cards(self, category, count):
+    def get_non_cards(self, card_list, category, count):
         """
         Gets all possible cards of the given category, throwing an error if fewer than the given number exist.
         
+        :param card_list: The cards of the given category contained by this randomizer's sets.
+        :type card_list: List[Card]
         :param category: The card category to get.
         :type category: str
         :param count: The desired count of cards. Used to throw an error if not possible to get this amount.
@@ -177,7 +260,6 @@ class Randomizer():
         :rtype: List[Card]
         """
 
-        card_list = [c for c in self.all_cards if c.category == category and self.any_set_contains(c)]
         if count > len(card_list):
             raise ValueError('too few %ss available in given sets: requested %d' % (category, count))
         return card_list
@@ -192,7 +274,7 @@ class Randomizer():
         :rtype: bool
         """
 
-        return any(game_set.contains(card) for game_set in self.sets)
+        return card.game_set in self.containing_sets
 
     def add_special_type_cards(self):
         """
@@ -201,7 +283,7 @@ class Randomizer():
         """
 
         for card in SpecialTypeCard:
-            if card.value.game_set in self.sets:
+            if card.value.game_set in self.set_lookup:
                 self.possible_cards[card.value.game_set].append(card.value)
 
     def remove_split_pile_cards(self):
@@ -211,20 +293,68 @@ class Randomizer():
         """
 
         for split_card in SplitPileCard:
-            if split_card.value.game_set in self.sets:
-                card_splits = split_card.value.name.split('/')
+            if split_card.value.game_set in self.set_lookup:
+                card_splits = frozenset(split_card.value.name.split('/'))
                 set_cards = self.possible_cards[split_card.value.game_set]
                 set_cards[:] = [card for card in set_cards if card.name not in card_splits]
 
+    def index_special_card_names(self):
+        """
+        Points the name index at the cards that are actually pooled for special and split pile randomizers.
+        Special type randomizers (i.e. Knights) are pooled as the enum's card rather than the one loaded from json, and
+        each half of a split pile (i.e. Encampment) stands for its pile's randomizer.
+        
+        """
+
+        for special_card in SpecialTypeCard:
+            self.cards_by_name[Randomizer.standardize_input(special_card.value.name)] = [special_card.value]
+        for split_card in SplitPileCard:
+            pile_cards = self.cards_by_name.setdefault(Randomizer.standardize_input(split_card.value.name),
+                                                       [split_card.value])
+            for name in split_card.value.name.split('/'):
+                self.cards_by_name[Randomizer.standardize_input(name)] = pile_cards
+
+    def add_inclusions_and_exclusions(self):
+        """
+        Adds the included cards and removes both the included and excluded cards from the possible card pool.
+        Excluding a card that is not in the pool, i.e. a basic card, has no effect.
+        
+        :raises ValueError: If an included card cannot be randomized or is type filtered, or if a card is specified
+                            for both inclusion and exclusion.
+        """
+
+        self.add_inclusions()
+        self.add_exclusions()
+
     def add_inclusions(self):
         """
-        Adds the included cards and removes them from the possible card pool and adjusts pick counts if necessary.
+        Adds the included cards and removes them from the possible card pool.
+        
+        :raises ValueError: If an included card cannot be randomized or is type filtered.
+        """
+
+        included = self.get_name_filtered_cards(self.include, '-i/--include')
+        for card in included:
+            if not card.can_pick:
+                raise ValueError('must not include "%s" as it is not a randomizer card' % card.name)
+            if Randomizer.in_type_filter(card, self.filter_mask):
+                raise ValueError('must not include "%s" as its types are filtered via -f/--filter-types' % card.name)
+        self.included_cards.extend(included)
+        self.remove_cards_from_pool(included)
+
+    def add_exclusions(self):
+        """
+        Removes the excluded cards from the possible card pool.
         
+        :raises ValueError: If a card is specified for both inclusion and exclusion.
         """
 
-        for card in self.get_name_filtered_cards(self.include, '-i/--include'):
-            self.included_cards.append(card)
-            self.remove_card_from_pool(card)
+        excluded = self.get_name_filtered_cards(self.exclude, '-x/--exclude')
+        included_set = set(self.included_cards)
+        for card in excluded:
+            if card in included_set:
+                raise ValueError('must not have "%s" specified for both inclusion and exclusion' % card.name)
+        self.remove_cards_from_pool(excluded)
 
     def adjust_counts(self):
         """
@@ -232,36 +362,42 @@ class Randomizer():
         
         """
 
+        # decrements the same set that load_cards pools the card under, as both go through containing_sets
+        set_indices = {game_set: i for i, game_set in enumerate(self.sets)}
         for card in self.included_cards:
-            for i in range(len(self.sets)):
-                if self.sets[i].contains(card):
-                    self.counts[i] -= 1
+            game_set = self.containing_sets.get(card.game_set)
+            if game_set is not None:
+                self.counts[set_indices[game_set]] -= 1
 
-    def add_exclusions(self):
+    def remove_cards_from_pool(self, cards):
         """
-        Removes the excluded cards from the possible card pool.
+        Removes the given cards from the possible card pool, rebuilding each affected set's pool once.
         
-        :raises ValueError
+        :param cards: The cards to remove from the pool.
+        :type cards: Iterable[Card]
         """
 
-        for card in self.get_name_filtered_cards(self.exclude, '-x/--exclude'):
-            print(card.name)
-            if card in self.included_cards:
-                raise ValueError('must not have "%s" specified for both inclusion and exclusion' % card.name)
-            self.remove_card_from_pool(card)
+        removed_by_set = defaultdict(set)
+        for card in cards:
+            game_set = self.pool_set_by_card.pop(card, None)
+            if game_set is not None:  # cards are unique, so each card is in at most one set's pool
+                removed_by_set[game_set].add(card)
+        for game_set, removed in removed_by_set.items():
+            set_cards = self.possible_cards[game_set]
+            set_cards[:] = [card for card in set_cards if card not in removed]
+        if removed_by_set:
+            self.card_pool = None  # stale, so the next normal mode randomize rebuilds it
 
     def remove_card_from_pool(self, card):
         """
         Removes the given card from the possible card pool.
+        Prefer remove_cards_from_pool for several cards, which rebuilds each affected pool only once.
         
         :param card: The card to remove from the pool.
         :type card: Card
         """
 
-        for game_set in self.possible_cards:
-            if game_set.contains(card):
-                self.possible_cards[game_set].remove(card)
-                break  # cards are unique, may exit function once found
+        self.remove_cards_from_pool((card,))
 
     def get_name_filtered_cards(self, card_args, arg_hint):
         """
@@ -278,14 +414,10 @@ class Randomizer():
 
         cards = []
         for card_arg in card_args:
-            found = False
             card_arg = Randomizer.standardize_input(card_arg)
-            for card in self.all_cards:
-                if card_arg == Randomizer.standardize_input(card.name):
-                    cards.append(card)
-                    found = True
-            if not found:
+            if card_arg not in self.cards_by_name:
                 raise ValueError('unable to find card specified via %s: %s' % (arg_hint, card_arg))
+            cards.extend(self.cards_by_name[card_arg])
         return cards
 
     def is_possible_card(self, card):
@@ -298,13 +430,14 @@ class Randomizer():
         :rtype: bool
         """
 
-        return card.can_pick and not Randomizer.in_type_filter(card, self.filter_types)
+        return card.can_pick and not Randomizer.in_type_filter(card, self.filter_mask)
 
     def validate_configuration(self):
         """
         Checks that this randomizer has a valid configuration and raises a ValueError if not.
         This function checks for the following conditions:
         * Conflicting editioned sets (i.e. Base 1E and Base 2E)
+        * Overlapping sets (i.e. Base and Base 2E, or the same set given twice)
         * Conflicting counts of sets and distributions (weights/counts)
         * Requested set counts not adding up to the requested number of cards
         * Too many included cards.
@@ -314,6 +447,7 @@ class Randomizer():
 
         self.validate_editioned_sets(GameSet.BASE_1E, GameSet.BASE_2E)
         self.validate_editioned_sets(GameSet.INTRIGUE_1E, GameSet.INTRIGUE_2E)
+        self.validate_distinct_sets()
         self.validate_distribution_lengths(self.weights, 'weights')
         self.validate_distribution_lengths(self.counts, 'counts')
         if self.counts and sum(self.counts) != self.number:
@@ -334,9 +468,26 @@ class Randomizer():
         :raises ValueError: If both sets exist in this randomizer.
         """
 
-        if set1 in self.sets and set2 in self.sets:
+        if set1 in self.set_lookup and set2 in self.set_lookup:
             raise ValueError('must choose only one of %s, %s' % (set1.full_set_name, set2.full_set_name))
 
+    def validate_distinct_sets(self):
+        """
+        Checks that no game set is contained by more than one of this randomizer's sets.
+        Used to avoid overlapping sets (Base/Base2E, or a set given twice), whose cards would belong to several pools.
+        
+        :raises ValueError: If a game set is contained by more than one set in this randomizer.
+        """
+
+        if len(self.set_lookup) != len(self.sets):
+            duplicate = next(g for g in self.sets if self.sets.count(g) > 1)
+            raise ValueError('must not choose %s more than once' % duplicate.full_set_name)
+        if len(self.containing_sets) != sum(len(game_set.contained_sets()) for game_set in self.sets):
+            for set1 in self.sets:
+                for set2 in self.sets:
+                    if set1 is not set2 and set1.contained_sets() & set2.contained_sets():
+                        raise ValueError('must choose only one of %s, %s' % (set1.full_set_name, set2.full_set_name))
+
     def validate_distribution_lengths(self, distribution, error_hint):
         """
         Checks if the given distribution list matches this randomizer's game set count.
@@ -359,13 +510,15 @@ class Randomizer():
         
         :param card: The card to check.
         :type card: Card
-        :param types: The list of types to check for.
-        :type types: List[str]
+        :param types: The mask of types to check for, as built by CardType.get_mask, or a list of type names.
+        :type types: Union[int, List[str]]
         :return: True if the card has any of the given types.
         :rtype: bool
         """
 
-        return any(t.lower() in types for t in card.types) if types else False
+        if not isinstance(types, int):  # type names, as this function accepted before type masks
+            types = CardType.get_mask(types)
+        return card.type_mask & types != 0
 
     @staticmethod
     def standardize_input(string):
@@ -378,4 +531,4 @@ class Randomizer():
         :rtype: str
         """
 
-        return string.replace("'", '').replace(' ', '').lower()
+        return string.translate(_STANDARDIZE_TABLE).lower()
@@ -0,0 +1,45 @@
+"""
+Tests for parsing the Dominion Wiki's raw card list in fetch_cards.
+
+"""
+
+import unittest
+
+from dtypes import Cost, GameSet
+from fetch_cards import CardFetcher
+
+_HEADER = '{| class="wikitable sortable"\n! Name !! Set !! Types !! Cost !! Text'
+
+
+def _row(name, text):
+    return '|{{Card|%s}} || [[Base]] || Action || data-sort-value="2" | {{Cost|2}} || %s' % (name, text)
+
+
+class ParseCardListTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fetcher = CardFetcher()
+
+    def test_parses_each_row(self):
+        raw_data = '\n|-\n'.join([_HEADER, _row('Cellar', '+1 Action'), _row('Chapel', 'Trash up to 4 cards.')])
+        cards = self.fetcher.parse_card_list(raw_data)
+        self.assertEqual([c.name for c in cards], ['Cellar', 'Chapel'])
+        self.assertEqual([c.text for c in cards], ['+1 Action', 'Trash up to 4 cards.'])
+        self.assertIs(cards[0].game_set, GameSet.BASE)
+        self.assertIs(cards[0].cost, Cost(2))
+
+    def test_row_ending_in_field_separator_stays_within_its_row(self):
+        raw_data = '\n|-\n'.join([_HEADER, _row('Cellar', '+1 Action ||'), _row('Chapel', 'Trash up to 4 cards.')])
+        cards = self.fetcher.parse_card_list(raw_data)
+        self.assertEqual([c.name for c in cards], ['Cellar', 'Chapel'])
+        self.assertNotIn('|-', cards[0].text)
+        self.assertNotIn('Chapel', cards[0].text)
+
+    def test_short_row_raises(self):
+        raw_data = '\n|-\n'.join([_HEADER, _row('Cellar', '+1 Action'), '|{{Card|Chapel}} || [[Base]] || Action'])
+        with self.assertRaises(ValueError):
+            self.fetcher.parse_card_list(raw_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Tests for Randomizer configuration and card pools, run against a small generated cards.json.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from dtypes import Card, Cost, GameSet, SpecialTypeCard, SplitPileCard
+from json_util import dump_json
+from randomizer import Randomizer
+
+
+def _set_cards(game_set, count):
+    return [Card('%s Card %d' % (game_set.full_set_name, i), 'Card', ['Action'], game_set, Cost(3), '')
+            for i in range(count)]
+
+
+class RandomizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.directory, 'cards.json')
+        cards = _set_cards(GameSet.BASE, 12) + _set_cards(GameSet.BASE_2E, 6) + _set_cards(GameSet.SEASIDE, 12)
+        cards.append(Card('Copper', 'Card', ['Treasure'], GameSet.BASE, Cost(0), ''))
+        cards.append(Card('Haven', 'Card', ['Action', 'Duration'], GameSet.SEASIDE, Cost(2), ''))
+        cards.append(Card('Dame Anna', 'Card', ['Action', 'Attack', 'Knight'], GameSet.DARK_AGES, Cost(5), ''))
+        cards.extend(c.value for c in SpecialTypeCard)
+        cards.extend(c.value for c in SplitPileCard)
+        dump_json([card.__json__() for card in cards], self.data_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_repeated_set_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Randomizer(self.data_path, ['seaside', 'seaside'])
+        with self.assertRaises(ValueError):
+            Randomizer(self.data_path, ['seaside', 'seaside'], counts=[5, 5], include=['Seaside Card 0'])
+
+    def test_overlapping_sets_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Randomizer(self.data_path, ['base', 'base2e'])
+        with self.assertRaises(ValueError):
+            Randomizer(self.data_path, ['base2e', 'base'], counts=[5, 5], include=['Base Card 0'])
+
+    def test_editioned_set_pools_shared_cards(self):
+        randomizer = Randomizer(self.data_path, ['base2e', 'seaside'])
+        self.assertEqual(len(randomizer.possible_cards[GameSet.BASE_2E]), 18)
+
+    def test_counts_decrement_the_set_pooling_the_included_card(self):
+        randomizer = Randomizer(self.data_path, ['seaside', 'base2e'], counts=[5, 5], include=['Base Card 0'])
+        self.assertEqual(randomizer.counts, [5, 4])
+        self.assertNotIn(randomizer.included_cards[0], randomizer.possible_cards[GameSet.BASE_2E])
+
+    def test_included_special_type_card_is_the_pooled_card(self):
+        randomizer = Randomizer(self.data_path, ['darkages', 'seaside'], include=['Knights'])
+        knights = SpecialTypeCard.KNIGHTS.value
+        self.assertEqual(randomizer.included_cards, [knights])
+        self.assertNotIn(knights, randomizer.possible_cards[GameSet.DARK_AGES])
+
+    def test_included_split_pile_half_is_its_pile(self):
+        randomizer = Randomizer(self.data_path, ['seaside'], include=['Encampment'])
+        self.assertEqual([c.name for c in randomizer.included_cards], ['Encampment/Plunder'])
+
+    def test_unrandomizable_inclusions_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Randomizer(self.data_path, ['base2e', 'seaside'], include=['Copper'])
+        with self.assertRaises(ValueError):
+            Randomizer(self.data_path, ['darkages'], include=['Dame Anna'])
+        with self.assertRaises(ValueError):
+            Randomizer(self.data_path, ['seaside'], include=['Haven'], filter_types=['duration'])
+
+    def test_excluding_an_unpooled_card_has_no_effect(self):
+        randomizer = Randomizer(self.data_path, ['base2e', 'seaside'], exclude=['Copper'])
+        self.assertEqual(len(randomizer.possible_cards[GameSet.BASE_2E]), 18)
+
+
+if __name__ == '__main__':
+    unittest.main()